@@ -16,6 +16,7 @@
 #税後利回りも計算するように修正
 #利回りの数値は端数処理をしないように修正
 
+import argparse
 import pandas as pd
 import numpy as np
 
@@ -23,67 +24,92 @@ import numpy as np
 input_file = 'div.csv'
 output_file = 'div_r.csv'
 
-# CSVファイルの読み込み
-df = pd.read_csv(input_file)
-
-print("元のデータ型:")
-print(df.dtypes)
-print("\n最初の数行:")
-print(df.head())
-
-# 通貨記号の置換辞書と変換対象の列
-currency_symbols = {'\$': '', '¥': ''}
+# 通貨記号の削除テーブルと変換対象の列
+currency_table = str.maketrans('', '', '$¥')
 columns_to_convert = ['配当/株', '前月終値']  # 必要に応じて他の列も追加
 
-# 通貨記号を削除して数値に変換
-for column in columns_to_convert:
-    df[column] = df[column].replace(currency_symbols, regex=True)
-    df[column] = pd.to_numeric(df[column], errors='coerce')
-
-print("\n変換後のデータ型:")
-print(df.dtypes)
-print("\n変換後の最初の数行:")
-print(df.head())
+# 行ごとの計算内容を表示するかどうか（--verbose で有効）
+VERBOSE = False
 
 # 年間利回りを計算する関数
-def calculate_annual_yield(df):
-    yields = []
-    for i in range(len(df)):
-        if df.loc[i, '番号'] < 12:  # 12未満はデータ不足のため計算しない
-            yields.append(np.nan)
-            print(f"行 {i+1}: 番号 {df.loc[i, '番号']} - データ不足のため計算なし")
-        else:
-            start_index = max(0, i - 11)
-            annual_dividend = df.loc[start_index:i, '配当/株'].sum()
-            previous_month_price = df.loc[i - 1, '前月終値']
-            
-            print(f"行 {i+1}: 番号 {df.loc[i, '番号']}")
-            print(f"  年間配当: {annual_dividend}")
-            print(f"  前月終値: {previous_month_price}")
-            
-            if pd.isna(previous_month_price) or previous_month_price == 0:
-                yields.append(np.nan)
-                print("  前月終値が0またはNaNのため計算不可")
+def calculate_annual_yield(df, tax_rate):
+    # 直近12ヶ月の配当合計（累積和の差分、先頭11行と欠損を含む期間はNaN）
+    dividends = df['配当/株'].to_numpy(dtype=np.float64)
+    missing = np.isnan(dividends)
+    cumsum = np.empty(dividends.size + 1)
+    cumsum[0] = 0.0
+    np.cumsum(np.where(missing, 0.0, dividends), out=cumsum[1:])
+    missing_count = np.concatenate(([0], np.cumsum(missing)))
+    annual_dividend = np.full(dividends.size, np.nan)
+    annual_dividend[11:] = np.where(missing_count[12:] - missing_count[:-12] > 0, np.nan, cumsum[12:] - cumsum[:-12])
+
+    # 前月終値
+    previous_month_price = df['前月終値'].shift(1)
+
+    # 番号が12未満（データ不足）と前月終値が0またはNaNの行は計算しない
+    insufficient = df['番号'] < 12
+    invalid = insufficient | previous_month_price.isna() | (previous_month_price == 0)
+    yields = np.where(invalid, np.nan, annual_dividend / previous_month_price * 100)
+
+    # 行ごとの計算内容はまとめて1回で出力する
+    if VERBOSE:
+        lines = []
+        for i, (number, dividend, price, value, short) in enumerate(
+                zip(df['番号'], annual_dividend, previous_month_price, yields, insufficient)):
+            if short:
+                lines.append(f"行 {i+1}: 番号 {number} - データ不足のため計算なし")
+                continue
+            lines.append(f"行 {i+1}: 番号 {number}")
+            lines.append(f"  年間配当: {dividend}")
+            lines.append(f"  前月終値: {price}")
+            if np.isnan(dividend):
+                lines.append("  配当に欠損があるため計算不可")
+            elif np.isnan(value):
+                lines.append("  前月終値が0またはNaNのため計算不可")
             else:
-                yield_value = (annual_dividend / previous_month_price) * 100
-                yields.append(yield_value)
-                print(f"  利回り: {yield_value}%")
-            print("---")
-    
-    return yields
+                lines.append(f"  利回り: {value}%")
+            lines.append("---")
+        print('\n'.join(lines))
+
+    return yields, yields * tax_rate
+
+def main():
+    global VERBOSE
+    parser = argparse.ArgumentParser(description='年間利回りを計算する')
+    parser.add_argument('--verbose', action='store_true', help='行ごとの計算内容を表示する')
+    VERBOSE = parser.parse_args().verbose
+
+    # CSVファイルの読み込み
+    df = pd.read_csv(input_file, memory_map=True)
+
+    print("元のデータ型:")
+    print(df.dtypes)
+    print("\n最初の数行:")
+    print(df.head())
+
+    # 通貨記号を削除して数値に変換
+    for column in columns_to_convert:
+        if pd.api.types.is_numeric_dtype(df[column]):  # 既に数値型の列は変換不要
+            continue
+        df[column] = pd.to_numeric(df[column].astype(str).str.translate(currency_table), errors='coerce')
+
+    print("\n変換後のデータ型:")
+    print(df.dtypes)
+    print("\n変換後の最初の数行:")
+    print(df.head())
 
-# 年間利回りの計算と「＄:利回り」列への入力
-df['＄:利回り'] = calculate_annual_yield(df)
+    # 年間利回りと税後利回りの計算と「＄:利回り」「＄:税後利回り」列への入力
+    df['＄:利回り'], df['＄:税後利回り'] = calculate_annual_yield(df, 0.9 * 0.79685)
 
-# 税後利回りの計算と「＄:税後利回り」列への入力
-df['＄:税後利回り'] = df['＄:利回り'] * 0.9 * 0.79685
+    # 結果をCSVファイルに保存
+    df.to_csv(output_file, index=False)
 
-# 結果をCSVファイルに保存
-df.to_csv(output_file, index=False)
+    print(f"\n利回り計算が完了し、結果を{output_file}に保存しました。")
 
-print(f"\n利回り計算が完了し、結果を{output_file}に保存しました。")
+    # 最終的な結果の確認
+    print("\n最終的な利回り計算結果:")
+    pd.set_option('display.float_format', '{:.6f}'.format)  # 小数点以下6桁まで表示
+    print(df[['番号', '配当/株', '前月終値', '＄:利回り', '＄:税後利回り']])
 
-# 最終的な結果の確認
-print("\n最終的な利回り計算結果:")
-pd.set_option('display.float_format', '{:.6f}'.format)  # 小数点以下6桁まで表示
-print(df[['番号', '配当/株', '前月終値', '＄:利回り', '＄:税後利回り']])
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+utils.py
+
+概要:
+パイプラインの各スクリプトで共通して使用する補助関数をまとめたモジュール。
+
+変更履歴:
+2026-10-15:
+    - 必要な列の存在確認 validate_columns を追加
+"""
+
+def validate_columns(df, required):
+    """
+    DataFrame に必要な列が存在するか確認し、存在しない列を返す。
+
+    Parameters:
+    df (pd.DataFrame): 確認するデータフレーム
+    required (iterable): 必要な列名
+
+    Returns:
+    list: 存在しない列名（required の順序）。すべて存在する場合は空のリスト
+    """
+    required = list(required)
+    missing = set(required).difference(df.columns)
+    return [column for column in required if column in missing]
@@ -4,6 +4,7 @@ yield.py
 ファイル構成:
  /python_lesson/
  ├── config.json
+ ├── utils.py
  ├── input.py
  ├── yield.py
  ├── preview.py
@@ -21,6 +22,11 @@ yield.py
 2. 各行のデータに基づいて利回りを計算する。
 3. 計算結果を`div_yield.csv`として保存する。
 
+コマンドラインオプション:
+    --batch      'ticker' 列を含む複数銘柄のデータを銘柄ごとにまとめて計算する
+    --overwrite  出力ファイルが既に存在する場合も確認ダイアログを出さずに上書きする
+入力・出力ファイルはオプションの有無にかかわらずダイアログボックスで選択する。
+
 変更履歴:
 2024-09-20:
     - 読み込みファイルをdiv_processed.csvに固定
@@ -31,6 +37,24 @@ yield.py
     - config.jsonに 'columns_to_convert' キーを追加
 2024-09-26:
     - コマンドライン方式を削除して、ダイアログボックスでの入力のみに修正
+      （2026-10-15 に --batch / --overwrite オプションを追加）
+2026-10-15:
+    - 利回り計算をNumPy配列で行うように修正
+    - Numbaがあれば利回りと税後利回りを1回のループで計算するように修正
+    - 通貨記号の削除を正規表現から str.translate に変更
+    - CSVの読み込みで pyarrow があれば使用し、'番号' を欠損可能な Int32 に変換するように修正
+    - 設定ファイルの読み込み結果をキャッシュするように修正
+    - '番号' が既に昇順の場合はソートを省略するように修正
+    - pyarrow があれば結果の保存に pyarrow のCSVライターを使用するように修正
+    - 複数文字の通貨記号はコンパイル済みの正規表現で削除するように修正
+    - 以前の正規表現形式でエスケープされた通貨記号（"\\$" など）も使えるように修正
+    - 最終結果の表示をDEBUGレベルのログに変更
+    - ダイアログの Tk ルートを1つだけ作成して使い回すように修正
+    - 既に数値型の列はデータクレンジングを省略するように修正
+    - 'ticker' 列で複数銘柄をまとめて計算する --batch オプションを追加
+    - 必要な列の確認を utils.validate_columns に移動
+    - 標準のCSVパーサーではファイルをメモリマップして読み込むように修正
+    - 上書き確認を省略する --overwrite オプションを追加
 
 以前の変更:
     - 利回り計算ロジックの改善
@@ -39,16 +63,43 @@ yield.py
 
 # 年間利回りを計算する
 # GUIを使用してファイル選択と上書き確認を行う
-# スクリプトはダイアログボックスのみを使用し、コマンドライン入力は不要
+# ファイルの指定はダイアログボックスで行い、コマンドラインでは次のオプションのみ指定できる
+#   --batch      'ticker' 列ごとに複数銘柄をまとめて計算する
+#   --overwrite  既存の出力ファイルを確認なしで上書きする
 
 import pandas as pd
 import numpy as np
 import json
+import argparse
+import re
+import codecs
 import logging
+import functools
+from types import MappingProxyType
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
 import os
+import atexit
+from utils import validate_columns
+
+# Numbaがあれば利回り計算をJITコンパイルする
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# pyarrowがあればCSVの書き込みに使用する
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# ダイアログ共通の Tk ルート（_get_root で作成）
+_ROOT = None
 
 # ロギングの設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -57,12 +108,25 @@ def load_config(config_file='config.json'):
     """
     設定ファイルを読み込み、必要な設定を返す。
     設定ファイルが存在しない場合や、必要なキーが欠けている場合はデフォルト値を使用する。
+    読み込み結果はファイルの更新時刻ごとにキャッシュされる。
 
     Parameters:
     config_file (str): 設定ファイルのパス
 
     Returns:
-    dict: 設定情報
+    MappingProxyType: 変更不可の設定情報
+        （'currency_symbols' から作成した 'currency_table'、'currency_pattern'、'currency_replacement' を含む）
+    """
+    try:
+        mtime = os.path.getmtime(config_file)
+    except OSError:
+        mtime = None
+    return _load_config(config_file, mtime)
+
+@functools.lru_cache(maxsize=4)
+def _load_config(config_file, mtime):
+    """
+    load_config の本体。キャッシュのキーに更新時刻 mtime を含めるため分けている。
     """
     default_config = {
         "currency_symbols": {"$": "", "¥": ""},
@@ -79,44 +143,225 @@ def load_config(config_file='config.json'):
         for key in default_config:
             if key not in user_config:
                 logging.warning(f"設定ファイルにキー '{key}' が存在しません。デフォルト値を使用します。")
-        return default_config
     except FileNotFoundError:
         logging.warning(f"設定ファイル {config_file} が見つかりません。デフォルト設定を使用します。")
-        return default_config
     except json.JSONDecodeError:
         logging.error(f"設定ファイル {config_file} の形式が正しくありません。デフォルト設定を使用します。")
-        return default_config
+    # 通貨記号がすべて1文字なら str.translate 用のテーブル、
+    # 複数文字の記号を含む場合はコンパイル済みの正規表現に変換
+    symbols = _normalize_currency_symbols(default_config['currency_symbols'])
+    if all(len(symbol) == 1 for symbol in symbols):
+        default_config['currency_table'] = MappingProxyType(str.maketrans(
+            {symbol: replacement or None for symbol, replacement in symbols.items()}
+        ))
+        default_config['currency_pattern'] = None
+        default_config['currency_replacement'] = None
+    else:
+        default_config['currency_table'] = None
+        default_config['currency_pattern'] = re.compile(
+            '|'.join(map(re.escape, sorted(symbols, key=len, reverse=True)))
+        )
+        # 置換後がすべて空文字なら文字列を渡し、一致ごとのPython呼び出しを避ける
+        if any(symbols.values()):
+            default_config['currency_replacement'] = lambda m: symbols[m.group(0)] or ''
+        else:
+            default_config['currency_replacement'] = ''
+    # キャッシュした設定が呼び出し側で変更されないよう、変更不可の形で返す
+    default_config['currency_symbols'] = MappingProxyType(symbols)
+    default_config['columns_to_convert'] = tuple(default_config['columns_to_convert'])
+    return MappingProxyType(default_config)
 
-def calculate_annual_yield(df):
+def _normalize_currency_symbols(currency_symbols):
     """
-    DataFrame に年間利回りを計算して追加する。
+    currency_symbols のキーを文字どおりの通貨記号に揃える。
+    以前はキーを正規表現として扱っていたため、"\\$" のようにエスケープされた記号は
+    エスケープを外して "$" として扱う。"\\d" などの文字クラスは文字列に置き換えられないため無視する。
 
     Parameters:
-    df (pd.DataFrame): 配当データを含むデータフレーム
+    currency_symbols (dict): 通貨記号と置換後の文字列の辞書
 
     Returns:
-    pd.Series: 計算された年間利回り
+    dict: キーを文字どおりの通貨記号にした辞書
     """
-    # データが '番号' でソートされていることを確認
-    df = df.sort_values('番号').reset_index(drop=True)
-    
-    # 12ヶ月の配当合計を計算
-    df['annual_dividend'] = df['配当/株'].rolling(window=12).sum()
+    symbols = {}
+    for symbol, replacement in currency_symbols.items():
+        if re.search(r'\\\w', symbol):
+            logging.warning(f"通貨記号 '{symbol}' は正規表現の文字クラスを含むため無視します。")
+            continue
+        # エスケープされていない正規表現の記号（'$' を除く）は、以前とは意味が変わる
+        if re.search(r'[.^*+?{}\[\]|()]', re.sub(r'\\.', '', symbol)):
+            logging.warning(f"通貨記号 '{symbol}' は正規表現ではなく文字列として削除します。")
+        symbols[re.sub(r'\\([^\w\s])', r'\1', symbol)] = replacement
+    return symbols
+
+def _yield_numpy(dividends, prices, numbers, tax_rate):
+    """
+    NumPy配列で年間利回りと税後利回りを計算する（Numbaが使えない場合の実装）。
+
+    Parameters:
+    dividends (np.ndarray): 配当/株
+    prices (np.ndarray): 前月終値
+    numbers (np.ndarray): 番号
+    tax_rate (float): 税後利回りの係数
+
+    Returns:
+    tuple: (年間利回り, 税後利回り) の配列
+    """
+    # 12ヶ月の配当合計を計算（累積和の差分、先頭11行と欠損を含む期間はNaN）
+    missing = np.isnan(dividends)
+    cumsum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, dividends))))
+    missing_count = np.concatenate(([0], np.cumsum(missing)))
+    annual_dividend = np.full(len(dividends), np.nan)
+    annual_dividend[11:] = np.where(missing_count[12:] - missing_count[:-12] > 0, np.nan, cumsum[12:] - cumsum[:-12])
     
     # 前月終値を取得
-    df['previous_month_price'] = df['前月終値'].shift(1)
+    previous_month_price = np.empty_like(prices)
+    previous_month_price[:1] = np.nan
+    previous_month_price[1:] = prices[:-1]
     
-    # 利回りの計算
-    df['＄:利回り'] = (df['annual_dividend'] / df['previous_month_price']) * 100
+    # 番号が12未満の行と前月終値がNaNまたは0の行はNaNのまま、それ以外の行だけ利回りを計算
+    valid = ~(numbers < 12) & np.isfinite(previous_month_price) & (previous_month_price != 0)
+    yields = np.divide(annual_dividend, previous_month_price, out=np.full(len(dividends), np.nan), where=valid)
+    yields *= 100
+    return yields, yields * tax_rate
+
+if NUMBA_AVAILABLE:
+    # NaN判定を残すため、fastmathからnnan/ninfを除いたフラグを指定する
+    @njit(cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn'})
+    def _yield_kernel(dividends, prices, numbers, tax_rate):
+        """
+        12ヶ月の配当合計・前月終値・利回り・税後利回りを1回のループで計算する。
+        """
+        size = len(dividends)
+        yields = np.empty(size)
+        after_tax = np.empty(size)
+        window_sum = 0.0
+        window_missing = 0
+        for i in range(size):
+            # 12ヶ月の配当合計を追加・削除で更新（欠損を含む期間はNaN）
+            if dividends[i] != dividends[i]:
+                window_missing += 1
+            else:
+                window_sum += dividends[i]
+            if i >= 12:
+                if dividends[i - 12] != dividends[i - 12]:
+                    window_missing -= 1
+                else:
+                    window_sum -= dividends[i - 12]
+            
+            previous_month_price = prices[i - 1] if i > 0 else np.nan
+            if (i < 11 or numbers[i] < 12 or window_missing > 0
+                    or previous_month_price != previous_month_price or previous_month_price == 0):
+                yields[i] = np.nan
+            else:
+                yields[i] = window_sum / previous_month_price * 100
+            after_tax[i] = yields[i] * tax_rate
+        return yields, after_tax
+else:
+    _yield_kernel = _yield_numpy
+
+def calculate_annual_yield(df, tax_rate):
+    """
+    年間利回りと税後利回りを計算する。
+    入力は '番号' の昇順であることを前提とし、昇順でない場合のみソートする。
+
+    Parameters:
+    df (pd.DataFrame): 配当データを含むデータフレーム
+    tax_rate (float): 税後利回りの係数
+
+    Returns:
+    tuple: (年間利回り, 税後利回り) の pd.Series（インデックスは df と同じ）
+    """
+    # 通常は '番号' の昇順で渡されるため、昇順でない場合のみソートする
+    # 元のインデックスは残し、戻り値が元の行に揃って代入されるようにする
+    if not df['番号'].is_monotonic_increasing:
+        df = df.sort_values('番号', kind='mergesort')
     
-    # 番号が12未満の行と前月終値がNaNまたは0の行はNaNに設定
-    df.loc[df['番号'] < 12, '＄:利回り'] = np.nan
-    df.loc[df['previous_month_price'].isna() | (df['previous_month_price'] == 0), '＄:利回り'] = np.nan
+    # pandasのインデックス処理を避けるためNumPy配列で計算する
+    dividends = df['配当/株'].to_numpy(dtype=np.float64)
+    prices = df['前月終値'].to_numpy(dtype=np.float64)
+    numbers = df['番号'].to_numpy(dtype=np.float64, na_value=np.nan)
+    yields, after_tax = _yield_kernel(dividends, prices, numbers, tax_rate)
     
     # 必要に応じてログを出力
     logging.info("利回り計算が完了しました。")
     
-    return df['＄:利回り']
+    return (pd.Series(yields, index=df.index, name='＄:利回り'),
+            pd.Series(after_tax, index=df.index, name='＄:税後利回り'))
+
+def save_csv(df, output_file):
+    """
+    DataFrame をBOM付きUTF-8のCSVとして保存する。
+    pyarrow があればそのCSVライターを使用し、なければ DataFrame.to_csv を使用する。
+
+    Parameters:
+    df (pd.DataFrame): 保存するデータフレーム
+    output_file (str): 出力ファイルのパス
+    """
+    if not PYARROW_AVAILABLE:
+        df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        return
+    # 変換に失敗しても既存の出力ファイルを壊さないよう、ファイルを開く前にテーブルを作成する
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with open(output_file, 'wb') as f:
+        f.write(codecs.BOM_UTF8)
+        pacsv.write_csv(table, f, write_options=pacsv.WriteOptions(include_header=True))
+
+def _get_root():
+    """
+    ダイアログの親となる非表示の Tk ルートを返す。
+    Tcl インタープリタの起動は重いため、初回呼び出し時に1つだけ作成し、終了時に破棄する。
+
+    Returns:
+    tk.Tk: 非表示のルートウィンドウ
+    """
+    global _ROOT
+    if _ROOT is None:
+        _ROOT = tk.Tk()
+        _ROOT.withdraw()  # メインウィンドウを非表示
+        atexit.register(_ROOT.destroy)
+    return _ROOT
+
+def calculate_annual_yield_by_group(df, tax_rate, group_column='ticker'):
+    """
+    複数銘柄をまとめたデータについて、銘柄ごとに年間利回りと税後利回りを計算する。
+    銘柄と '番号' で1回だけ並べ替え、銘柄ごとの連続した区間に対して利回り計算を行う。
+    銘柄が空の行はどの銘柄にも含めず、利回りはNaNとする。
+
+    Parameters:
+    df (pd.DataFrame): 配当データと銘柄の列を含むデータフレーム
+    tax_rate (float): 税後利回りの係数
+    group_column (str): 銘柄を表す列名
+
+    Returns:
+    tuple: (年間利回り, 税後利回り) の pd.Series（インデックスは df と同じ）
+    """
+    codes, _ = pd.factorize(df[group_column], sort=False)
+    numbers = df['番号'].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    # 銘柄が空の行（コード -1）は他の銘柄と混ざらないよう計算から除外し、NaNのままにする
+    grouped = np.flatnonzero(codes >= 0)
+    if len(grouped) < len(df):
+        logging.warning(f"'{group_column}' が空の {len(df) - len(grouped)} 行は利回りを計算しません。")
+    order = grouped[np.lexsort((numbers[grouped], codes[grouped]))]
+    dividends = df['配当/株'].to_numpy(dtype=np.float64)[order]
+    prices = df['前月終値'].to_numpy(dtype=np.float64)[order]
+    numbers = numbers[order]
+    
+    # 銘柄が切り替わる位置で区切り、区間ごとに計算して元の行の位置に書き戻す
+    boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+    yields = np.full(len(df), np.nan)
+    after_tax = np.full(len(df), np.nan)
+    for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(order)]):
+        rows = order[start:stop]
+        yields[rows], after_tax[rows] = _yield_kernel(
+            dividends[start:stop], prices[start:stop], numbers[start:stop], tax_rate
+        )
+    
+    logging.info(f"{len(boundaries) + 1 if len(order) else 0} 銘柄の利回り計算が完了しました。")
+    
+    return (pd.Series(yields, index=df.index, name='＄:利回り'),
+            pd.Series(after_tax, index=df.index, name='＄:税後利回り'))
 
 def select_file(save=False, default_name='div_yield.csv'):
     """
@@ -129,19 +374,18 @@ def select_file(save=False, default_name='div_yield.csv'):
     Returns:
     str: 選択されたファイルのパス
     """
-    root = tk.Tk()
-    root.withdraw()  # メインウィンドウを非表示
+    root = _get_root()
     if save:
         initial_dir = os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else Path.home()
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
             initialdir=initial_dir,
-            initialfile=default_name
+            initialfile=default_name,
+            parent=root
         )
     else:
-        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-    root.destroy()
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")], parent=root)
     return file_path
 
 def confirm_overwrite(output_file):
@@ -154,13 +398,16 @@ def confirm_overwrite(output_file):
     Returns:
     bool: 上書きする場合はTrue、しない場合はFalse
     """
-    root = tk.Tk()
-    root.withdraw()  # メインウィンドウを非表示
-    result = messagebox.askyesno("確認", f"出力ファイル '{output_file}' は既に存在します。上書きしますか？")
-    root.destroy()
-    return result
+    return messagebox.askyesno("確認", f"出力ファイル '{output_file}' は既に存在します。上書きしますか？",
+                               parent=_get_root())
 
 def main():
+    parser = argparse.ArgumentParser(description='配当データから年間利回りを計算する')
+    parser.add_argument('--batch', action='store_true',
+                        help="'ticker' 列を含む複数銘柄のデータを銘柄ごとにまとめて計算する")
+    parser.add_argument('--overwrite', action='store_true',
+                        help='出力ファイルが既に存在する場合も確認せずに上書きする')
+    args = parser.parse_args()
     config = load_config()
     
     # 入力ファイルの選択
@@ -175,23 +422,32 @@ def main():
         logging.error("出力ファイルが選択されませんでした。")
         return
     
-    # 出力ファイルが既に存在する場合の確認
-    if os.path.exists(output_file):
+    # 出力ファイルが既に存在する場合の確認（--overwrite 指定時は確認しない）
+    if os.path.exists(output_file) and not args.overwrite:
         overwrite = confirm_overwrite(output_file)
         if not overwrite:
             logging.info("処理を中断しました。")
             return
     
-    # データの読み込み
+    # データの読み込み（変換対象の列は型推論に任せ、数値として読めた場合はクレンジングを省略する）
     try:
-        df = pd.read_csv(input_file, encoding='utf-8-sig')
+        try:
+            df = pd.read_csv(input_file, encoding='utf-8-sig', engine='pyarrow')
+        except ImportError:
+            logging.info("pyarrow が見つからないため、標準のCSVパーサーを使用します。")
+            # pyarrow エンジンでは memory_map が無視されるため、Cエンジンの場合のみ指定する
+            df = pd.read_csv(input_file, encoding='utf-8-sig', engine='c', memory_map=True)
+        # '番号' は欠損を保持できる Int32 にする（表計算ソフトが出力する空行があっても読み込める）
+        # pyarrow エンジンに dtype を渡すと空行で他の列の変換が失敗するため、読み込み後に変換する
+        if '番号' in df.columns:
+            df['番号'] = df['番号'].astype('Int32')
     except FileNotFoundError:
         logging.error(f"入力ファイル '{input_file}' が見つかりません。")
         return
     except pd.errors.EmptyDataError:
         logging.error(f"入力ファイル '{input_file}' が空です。")
         return
-    except pd.errors.ParserError as e:
+    except (pd.errors.ParserError, ValueError) as e:
         logging.error(f"入力ファイル '{input_file}' の解析中にエラーが発生しました: {e}")
         return
     
@@ -201,15 +457,24 @@ def main():
     logging.info(df.head())
     
     # 必要な列が存在するか確認
-    missing_columns = [col for col in config['columns_to_convert'] if col not in df.columns]
+    required_columns = list(config['columns_to_convert']) + (['ticker'] if args.batch else [])
+    missing_columns = validate_columns(df, required_columns)
     if missing_columns:
         logging.error(f"指定された列 {missing_columns} が入力ファイルに存在しません。")
         return
     
     # 列のデータクレンジング
     for column in config['columns_to_convert']:
-        df[column] = df[column].replace(config['currency_symbols'], regex=True)
-        df[column] = pd.to_numeric(df[column], errors='coerce')
+        # 既に数値型の列は文字列処理を省略する
+        if pd.api.types.is_numeric_dtype(df[column]):
+            continue
+        if config['currency_pattern'] is None:
+            values = df[column].astype(str).str.translate(config['currency_table'])
+        else:
+            values = df[column].astype(str).str.replace(
+                config['currency_pattern'], config['currency_replacement'], regex=True
+            )
+        df[column] = pd.to_numeric(values, errors='coerce')
     
     logging.info("\n変換後のデータ型:")
     logging.info(df.dtypes)
@@ -217,21 +482,24 @@ def main():
     logging.info(df.head())
     
     # 利回り計算
-    df['＄:利回り'] = calculate_annual_yield(df)
-    df['＄:税後利回り'] = df['＄:利回り'] * config['tax_rate']
+    if args.batch:
+        df['＄:利回り'], df['＄:税後利回り'] = calculate_annual_yield_by_group(df, config['tax_rate'])
+    else:
+        df['＄:利回り'], df['＄:税後利回り'] = calculate_annual_yield(df, config['tax_rate'])
     
     # データの保存
     try:
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        save_csv(df, output_file)
         logging.info(f"\n利回り計算が完了し、結果を '{output_file}' に保存しました。")
     except Exception as e:
         logging.error(f"出力ファイル '{output_file}' の保存中にエラーが発生しました: {e}")
         return
     
-    # 最終結果のログ出力
-    logging.info("\n最終的な利回り計算結果:")
-    pd.set_option('display.float_format', '{:.6f}'.format)
-    logging.info(df[['番号', '配当/株', '前月終値', '＄:利回り', '＄:税後利回り']])
+    # 最終結果のログ出力（DEBUGレベルが有効な場合のみ文字列化する）
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        with pd.option_context('display.float_format', '{:.6f}'.format):
+            logging.debug("\n最終的な利回り計算結果:\n%s",
+                          df[['番号', '配当/株', '前月終値', '＄:利回り', '＄:税後利回り']].to_string())
 
 if __name__ == "__main__":
     main()